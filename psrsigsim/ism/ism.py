@@ -2,28 +2,379 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 import numpy as np
 from scipy import stats
+from scipy import fft as sfft
 import scipy.signal as spsig
 import sys, time
-from ..utils.utils import make_quant, shift_t
+import multiprocessing
+from functools import lru_cache
+from ..utils.utils import make_quant
 from ..utils.constants import DM_K
 from ..utils.constants import KOLMOGOROV_BETA
 from ..pulsar.portraits import DataPortrait
+# optional packages, see the 'fast' and 'gpu' extras in setup.py
+try:
+    import numba
+    use_numba = True
+except ImportError:
+    use_numba = False
+try:
+    import pyfftw
+    use_pyfftw = True
+except ImportError:
+    use_pyfftw = False
+try:
+    import cupy as cp
+    use_cupy = True
+except ImportError:
+    use_cupy = False
+# number of data shapes for which FFTW plans are kept, if pyfftw is used
+FFT_PLAN_SHAPES = 2
+
+
+def _as_float32(data):
+    """
+    Returns data as a C-contiguous single precision array, only copying if
+    needed. Single precision halves the memory traffic of the FFTs, and
+    scipy.fft keeps complex64 precision for float32 input. Integer data is
+    always copied, see `_store_data`.
+    """
+    return np.ascontiguousarray(data, dtype=np.float32)
+
+def _store_data(signal, data):
+    """
+    Stores processed single precision data in a signal. Floating point data
+    replaces the signal's data array. Integer (int8) data is cast back into
+    the signal's own array, so the data keeps the signal's dtype.
+    """
+    if np.issubdtype(signal._data.dtype, np.floating):
+        signal._data = data
+    else:
+        signal._data[:] = data
+
+def _expj(theta, dtype=np.complex64):
+    """
+    Returns exp(1j*theta) for a real array theta. The real and imaginary
+    parts are filled with the vectorized real cos and sin, which is faster
+    than numpy's complex exp.
+    """
+    out = np.empty(np.shape(theta), dtype=dtype)
+    np.cos(theta, out=out.real)
+    np.sin(theta, out=out.imag)
+    return out
+
+@lru_cache(maxsize=1)
+def _cuda_available():
+    """
+    Whether cupy is installed and finds a CUDA device. This is only checked
+    when the GPU is first asked for, not at import, since querying the
+    device initializes the CUDA runtime.
+    """
+    if not use_cupy:
+        return False
+    try:
+        return cp.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        # no usable CUDA driver or device
+        return False
+
+class _PlanCache(dict):
+    """
+    Dictionary of FFTW plans, see `_fftw_plans`, that keeps plans for at
+    most max_shapes data shapes.
+    """
+    def __init__(self, max_shapes=FFT_PLAN_SHAPES):
+        super(_PlanCache, self).__init__()
+        self.max_shapes = max_shapes
+
+def _fftw_plans(plans, shape, dtype):
+    """
+    Returns the (rfft, irfft) FFTW plans for real data of the given shape and
+    dtype from the cache dictionary plans, building them the first time. The
+    plans are built on their own aligned scratch arrays, and the irfft plan
+    transforms the rfft plan's output back into its input array, so a shape
+    costs one real and one complex array. Plans for at most max_shapes shapes
+    (FFT_PLAN_SHAPES for a plain dictionary) are kept, the least recently
+    used are dropped.
+    """
+    key = (tuple(shape), np.dtype(dtype).str)
+    pair = plans.pop(key, None)
+    if pair is None:
+        threads = multiprocessing.cpu_count()
+        rfft = pyfftw.builders.rfft(pyfftw.empty_aligned(shape, dtype=dtype),
+                                    axis=1, threads=threads)
+        irfft = pyfftw.FFTW(rfft.output_array, rfft.input_array, axes=(1,),
+                            direction='FFTW_BACKWARD', threads=threads,
+                            flags=(pyfftw.config.PLANNER_EFFORT,
+                                   'FFTW_DESTROY_INPUT'))
+        pair = (rfft, irfft)
+    # most recently used last
+    plans[key] = pair
+    while len(plans) > getattr(plans, 'max_shapes', FFT_PLAN_SHAPES):
+        del plans[next(iter(plans))]
+    return pair
+
+def _rfft(data2d, plans=None):
+    """
+    Batched real FFT along the last axis of a 2-D array. If pyfftw is
+    available and a plan cache dictionary is given, the data is copied into
+    the cached FFTW plan for this shape and dtype, see `_fftw_plans`. The
+    plan owns its output array, so the result is only valid until the next
+    transform of the same shape and must be consumed right away. Otherwise
+    the multi-threaded scipy.fft is used.
+    """
+    if use_pyfftw and plans is not None:
+        rfft, _ = _fftw_plans(plans, data2d.shape, data2d.dtype)
+        rfft.input_array[...] = data2d
+        return rfft()
+    return sfft.rfft(data2d, axis=1, workers=-1)
+
+def _irfft(fourier, Nsamp, plans=None):
+    """
+    Batched inverse real FFT along the last axis of a 2-D array, giving Nsamp
+    samples per row. See `_rfft` for the use of plans, the result is again
+    only valid until the next transform. The input array may be overwritten.
+    """
+    if use_pyfftw and plans is not None:
+        _, irfft = _fftw_plans(plans, (fourier.shape[0], Nsamp),
+                               np.finfo(fourier.dtype).dtype)
+        if fourier is not irfft.input_array:
+            irfft.input_array[...] = fourier
+        return irfft()
+    return sfft.irfft(fourier, n=Nsamp, axis=1, workers=-1, overwrite_x=True)
+
+if use_numba:
+    @numba.njit(parallel=True, cache=True)
+    def _apply_phase(fourier, delays_samples, Nsamp):
+        """
+        Multiplies each row of a 2-D array of real FFTs, in place, by the
+        phase ramp exp(-2j*pi*delays_samples[row]*k/Nsamp) that shifts it in
+        time. The phase, its cos and sin, and the multiply are done in one
+        pass per row with channels in parallel, so the ramp is never stored.
+        As with `_chirp_kernel`, fastmath is not used since the phases can
+        be large.
+        """
+        for ii in numba.prange(fourier.shape[0]):
+            dphase = -2*np.pi*delays_samples[ii]/Nsamp
+            for kk in range(fourier.shape[1]):
+                theta = dphase*kk
+                fourier[ii,kk] *= complex(np.cos(theta), np.sin(theta))
+
+if use_cupy:
+    # GPU version of `_apply_phase`, multiplying the real FFTs in place
+    _cupy_apply_phase = cp.ElementwiseKernel(
+        'raw float64 delays_samples, int64 Nfreq, int64 Nsamp',
+        'T fourier',
+        '''
+        double theta = -2*M_PI*delays_samples[i/Nfreq]*(i%Nfreq)/Nsamp;
+        fourier *= T(cos(theta), sin(theta));
+        ''',
+        'psrsigsim_apply_phase')
+
+def _fft_shift_inplace(data2d, delays_samples, out=None, plans=None):
+    """
+    Shift each row of a 2-D data array in time using the Fourier shift
+    theorem with a single batched real FFT. Shifts may be fractional numbers
+    of samples and positive shifts are delays.
+
+    Parameters
+    ----------
+
+    data2d [array] : [Nchan, Nsamp] array of time series data
+    delays_samples [array] : delay of each row in units of samples
+    out [array] : array to store the shifted data in, if None data2d is
+                  shifted in place
+    plans [dict] : cache of FFTW plans, see `_rfft`
+    """
+    if out is None:
+        out = data2d
+    Nsamp = data2d.shape[1]
+    fourier = _rfft(data2d, plans=plans)
+    if use_numba:
+        _apply_phase(fourier, delays_samples, Nsamp)
+    else:
+        fs = sfft.rfftfreq(Nsamp)
+        fourier *= _expj(-2*np.pi*delays_samples[:,None]*fs[None,:],
+                         dtype=fourier.dtype)
+    out[:] = _irfft(fourier, Nsamp, plans=plans)
+
+def _convolve_exp_tails(profiles, tau_samples):
+    """
+    Circularly convolve each row of a 2-D array of pulse profiles with a
+    normalized one-sided exponential scattering tail, using a single batched
+    real FFT. The DFT of the periodically wrapped, sampled exponential
+    exp(-n/tau) has the closed form (1-a)/(1-a*exp(-2j*pi*k/Nph)) with
+    a = exp(-1/tau), so the tails never need to be built or transformed.
+    The kernel is normalized to unit sum, so the profile sums are preserved.
+    Tails so long that a rounds to 1 become a flat kernel, which replaces
+    each profile by its mean.
+
+    Parameters
+    ----------
+
+    profiles [array] : [Nchan, Nph] array of pulse profiles
+    tau_samples [array] : scattering timescale of each profile in phase bins
+
+    Returns
+    -------
+
+    out [array] : [Nchan, Nph] array of scatter broadened profiles
+    """
+    Nph = profiles.shape[1]
+    inv_tau = 1.0/np.asarray(tau_samples, dtype=np.float64)[:,None]
+    a = np.exp(-inv_tau)
+    # 1-a without cancellation for long tails
+    one_minus_a = -np.expm1(-inv_tau)
+    k = np.arange(Nph//2 + 1)
+    denom = 1 - a*_expj(-2*np.pi*k[None,:]/Nph, dtype=np.complex128)
+    denom[:,0] = one_minus_a[:,0]
+    # the k = 0 term is exactly 1, and rows with a == 1 keep the flat kernel
+    kernel = np.zeros(denom.shape, dtype=np.complex128)
+    kernel[:,0] = 1.0
+    np.divide(one_minus_a, denom, out=kernel,
+              where=np.broadcast_to(one_minus_a > 0, denom.shape))
+    fourier = sfft.rfft(profiles, axis=1, workers=-1)
+    fourier *= kernel
+    return sfft.irfft(fourier, n=Nph, axis=1, workers=-1)
+
+if use_numba:
+    @numba.njit(parallel=True, cache=True)
+    def _chirp_kernel(f, f0, C, out):
+        """
+        Fills out with exp(1j*C*f**2/(f+f0)) in a single pass over f. The
+        dispersive phases are very large, so fastmath is not used, to keep
+        accurate range reduction in cos and sin.
+        """
+        for ii in numba.prange(f.size):
+            theta = C*f[ii]*f[ii]/(f[ii]+f0)
+            out[ii] = complex(np.cos(theta), np.sin(theta))
+
+def _chirp(f, f0, C, dtype=np.complex64):
+    """
+    Returns exp(1j*C*f**2/(f+f0)), the form of the dispersion transfer
+    function, using a fused numba kernel when available.
+    """
+    if use_numba:
+        out = np.empty(f.shape, dtype=dtype)
+        _chirp_kernel(f, f0, C, out)
+        return out
+    return _expj(C*f*f/(f+f0), dtype=dtype)
+
+@lru_cache(maxsize=2)
+def _baseband_H(Nsamp, dt_s, bw_mhz, f0_mhz, dm_val):
+    """
+    Dispersion transfer function for baseband data, Lorimer & Kramer 2006,
+    eqn. 5.21. Results are cached, since signals with the same sampling, band
+    and DM are commonly dispersed many times in simulation runs, and are
+    returned read-only. Each H is as long as the data, so only the most
+    recent two are kept.
+
+    Parameters
+    ----------
+
+    Nsamp [int] : number of time samples per channel
+    dt_s [float] : sample spacing [s]
+    bw_mhz [float] : bandwidth [MHz]
+    f0_mhz [float] : center frequency [MHz]
+    dm_val [float] : dispersion measure [pc/cm^3]
+    """
+    fourier_len = Nsamp//2 + 1
+    u = np.fft.rfftfreq(2 * fourier_len - 1, d=dt_s) # taken as MHz
+    f = u-bw_mhz/2. # u in [0,bw], f in [-bw/2, bw/2]
+    # dispersion constant in units consistent with MHz and us
+    dm_k = DM_K.to('MHz^2 us cm^3 / pc').value
+    H = _chirp(f, f0_mhz, 2*np.pi*dm_k*dm_val/f0_mhz**2)
+    H.flags.writeable = False
+    return H
+
+def _scatt_exp(beta):
+    """
+    Frequency scaling exponent of the scattering timescale for a medium with
+    power law index beta, -22/5 for a Kolmogorov medium. The scintillation
+    bandwidth scales with the opposite exponent. The two branches agree at
+    beta = 4.
+    """
+    return -2.0*beta/(beta-2) if beta < 4 else -8.0/(6-beta)
+
+def _scint_time_exp(beta):
+    """
+    Frequency scaling exponent of the scintillation timescale for a medium
+    with power law index beta, 6/5 for a Kolmogorov medium.
+    """
+    return 2.0/(beta-2) if beta < 4 else float(beta-2)/(6-beta)
+
+if use_numba:
+    @numba.vectorize(['f8(f8,f8,f8,f8)'], target='parallel', fastmath=True)
+    def _scale_law_kernel(x, nu_i, nu_f, exp):
+        return x*(nu_f/nu_i)**exp
+
+def _scale_law(x, nu_i, nu_f, exp):
+    """
+    Power law frequency scaling, x*(nu_f/nu_i)**exp. Arrays of plain floats
+    are evaluated with a parallel numba ufunc when numba is available,
+    anything else (scalars, astropy quantities) with numpy.
+    """
+    if use_numba and np.ndim(nu_f) > 0 \
+            and not any(hasattr(v, 'unit') for v in (x, nu_i, nu_f)):
+        return _scale_law_kernel(x, nu_i, nu_f, exp)
+    return x*np.power(nu_f/nu_i, exp)
 
 class ISM(object):
     '''
     Class for modeling interstellar medium effects on pulsar signals.
     '''
-    def __init__(self):
-        ''''''
-        pass
+    def __init__(self, shapes=None, backend=None):
+        '''
+        Optional Args:
+            shapes [list]: data shapes, as (Nchan, Nsamp) tuples, to
+                prepare at construction. FFTW plans (with pyfftw) and
+                compiled kernels (with numba) for single precision data of
+                these shapes are built up front, so the first dispersion of
+                a signal with one of these shapes does not pay the planning
+                and compilation cost. Plans are kept for all of these
+                shapes, or for ``FFT_PLAN_SHAPES`` shapes if more.
+
+            backend [str]: where to shift filterbank data, ``'cpu'`` or
+                ``'cupy'`` (GPU, requires cupy and a CUDA device). Default
+                ``None`` uses the CPU.
+        '''
+        if backend not in (None, 'cpu', 'cupy'):
+            raise ValueError("backend must be None, 'cpu' or 'cupy'")
+        if backend=='cupy' and not _cuda_available():
+            msg = "the 'cupy' backend requires cupy and a CUDA device"
+            raise ImportError(msg)
+        self._backend = backend
+        shapes = [] if shapes is None else list(shapes)
+        # FFTW plans, keyed by shape and dtype, if pyfftw is used
+        self._fft_plans = _PlanCache(max(FFT_PLAN_SHAPES, len(shapes)))
+        for Nchan, Nsamp in shapes:
+            self._prepare_shape(Nchan, Nsamp)
+
+    def _prepare_shape(self, Nchan, Nsamp):
+        """
+        Builds the FFTW plans and compiles the phase kernel for single
+        precision data of shape [Nchan, Nsamp], the precision all data is
+        shifted in.
+        """
+        data = np.zeros((Nchan, Nsamp), dtype=np.float32)
+        fourier = _rfft(data, plans=self._fft_plans)
+        if use_numba:
+            _apply_phase(fourier, np.zeros(Nchan), Nsamp)
+        _irfft(fourier, Nsamp, plans=self._fft_plans)
 
-    def disperse(self, signal, dm):
+    def disperse(self, signal, dm, verbose=False):
         r"""
         Function to calculate the dispersion per frequency bin for :math:`1/\nu^{2}`
         dispersion.
 
         .. math::
             \Delta t_{\rm{DM}} = 4.15\times 10^{6}~\rm{ms} \times \rm{DM} \times \frac{1}{\nu^{2}}
+
+        If verbose is True, the time taken to disperse a filterbank signal
+        is printed.
+
+        NOTE: Floating point signal data is converted to single precision
+        (float32) before it is dispersed, matching the signal's default
+        dtype. Integer (int8) data keeps its dtype.
         """
         signal._dm = make_quant(dm,'pc/cm^3')
 
@@ -31,47 +382,84 @@ class ISM(object):
             raise ValueError('Signal has already been dispersed!')
 
         if signal.sigtype=='FilterBankSignal':
-            self._disperse_filterbank(signal, signal._dm)
+            self.apply_delays(signal, dm=signal._dm, verbose=verbose)
         elif signal.sigtype=='BasebandSignal':
             self._disperse_baseband(signal, signal._dm)
 
         signal._dispersed = True
 
-    def _disperse_filterbank(self, signal, dm):
+    def _dispersion_delays(self, signal, dm):
+        """
+        Returns the dispersive delay [ms] of each frequency channel, as
+        compared to infinite frequency.
+        """
         #freq in MHz, delays in milliseconds
-        freq_array = signal._dat_freq
-        time_delays = (DM_K * dm * np.power(freq_array,-2)).to('ms')
+        freq_mhz = signal._dat_freq.to('MHz').value
+        dm_k = DM_K.to('ms MHz^2 cm^3 / pc').value
+        return dm_k * dm.to('pc/cm^3').value / freq_mhz**2
+
+    def _apply_time_shift(self, signal, delays_ms, action='shifted',
+                          verbose=False):
+        """
+        Shifts every frequency channel of a filterbank signal by its delay
+        with a single batched FFT, and adds the delays to the signal's total
+        delay. Floating point signal data is converted to single precision,
+        integer data is shifted in single precision and cast back.
+
+        Parameters
+        ----------
+
+        signal [object] : signal class object which has been previously defined
+        delays_ms [array] : delay [ms] of each frequency channel
+        action [str] : description of the shift for the progress message
+        verbose [bool] : if True, print the time taken to shift the signal
+        """
+        data = _as_float32(signal._data)
+        time_delays = make_quant(delays_ms, 'ms')
         if signal.delay==None:
             signal._delay=time_delays
         else:
             signal._delay += time_delays
-        #Dispersion as compared to infinite frequency
-        shift_dt = (1/signal._samprate).to('ms')
+        # get time shift in samples based on the sample rate
+        shift_dt = (1/signal._samprate).to('ms').value
         shift_start = time.time()
-        # check if there are less than 20 frequency channels
-        if signal.Nchan <= 20:
-            div_fac = 1
+        # shift every channel at once
+        delays_samples = np.asarray(delays_ms, dtype=np.float64)/shift_dt
+        if self._use_gpu():
+            self._apply_time_shift_gpu(data, delays_samples)
         else:
-            div_fac = 20
-
-        for ii, freq in enumerate(freq_array):
-            signal._data[ii,:] = shift_t(signal._data[ii,:],
-                                         time_delays[ii].value,
-                                         dt=shift_dt.value)
-            if (ii+1) % int(signal.Nchan//div_fac) ==0:
-                shift_check = time.time()
-                percent = round((ii + 1)*100/signal.Nchan)
-                elapsed = shift_check-shift_start
-                chk_str = '\r{0:2.0f}% dispersed'.format(percent)
-                chk_str += ' in {0:4.3f} seconds.'.format(elapsed)
-
-                try:
-                    print(chk_str , end='', flush=True)
-                #This is the Python 2 version
-                #__future__ does not have 'flush' kwarg.
-                except:
-                    print(chk_str , end='')
-                sys.stdout.flush()
+            _fft_shift_inplace(data, delays_samples, plans=self._fft_plans)
+        _store_data(signal, data)
+
+        if verbose:
+            elapsed = time.time()-shift_start
+            chk_str = '\r100% {0} in {1:4.3f} seconds.'.format(action, elapsed)
+            try:
+                print(chk_str , end='', flush=True)
+            #This is the Python 2 version
+            #__future__ does not have 'flush' kwarg.
+            except:
+                print(chk_str , end='')
+            sys.stdout.flush()
+
+    def _use_gpu(self):
+        """
+        Whether to shift data on the GPU. The GPU is only used if the
+        ``'cupy'`` backend was asked for.
+        """
+        return self._backend=='cupy'
+
+    def _apply_time_shift_gpu(self, data, delays_samples):
+        """
+        GPU version of the batched FFT shift in `_apply_time_shift`, using
+        cupy. The data is copied to the device, shifted, and copied back
+        into the data array.
+        """
+        Nsamp = data.shape[1]
+        fourier = cp.fft.rfft(cp.asarray(data), axis=1)
+        _cupy_apply_phase(cp.asarray(delays_samples, dtype=cp.float64),
+                          fourier.shape[1], Nsamp, fourier)
+        data[:] = cp.asnumpy(cp.fft.irfft(fourier, n=Nsamp, axis=1))
 
     def _disperse_baseband(self, signal, dm):
         """
@@ -79,25 +467,21 @@ class ISM(object):
         Handbook, D. Lorimer and M. Kramer, 2006
         Returns a baseband signal dispersed by the ISM.
         """
-        for x in range(signal.Nchan):
-            sig = signal._data[x]
-            f0 = signal._fcent
-            dt = (1/signal._samprate).to('us')
-
-            fourier = np.fft.rfft(sig)
-            u = make_quant(np.fft.rfftfreq(2 * len(fourier) - 1,
-                                d=dt.to('s').value), 'MHz')
-            f = u-signal.bw/2. # u in [0,bw], f in [-bw/2, bw/2]
-
-            # Lorimer & Kramer 2006, eqn. 5.21
-            H = np.exp(1j*2*np.pi*DM_K/((f+f0)*f0**2)*dm*f**2)
-
-            product = fourier*H
-            Dispersed = np.fft.irfft(product)
-
-            signal._data[x] = Dispersed
-
-    def FD_shift(self, signal, FD_params):
+        data = _as_float32(signal._data)
+        # the transfer function is the same for every channel
+        Nsamp = data.shape[1]
+        H = _baseband_H(Nsamp, (1/signal._samprate).to('s').value,
+                        signal.bw.to('MHz').value,
+                        signal._fcent.to('MHz').value,
+                        dm.to('pc/cm^3').value)
+
+        # transform all channels at once
+        fourier = _rfft(data, plans=self._fft_plans)
+        fourier *= H[None,:]
+        data[:] = _irfft(fourier, Nsamp, plans=self._fft_plans)
+        _store_data(signal, data)
+
+    def FD_shift(self, signal, FD_params, verbose=False):
         r"""
         This calculates the delay that will be added due to an arbitrary number
         of input FD parameters following the NANOGrav standard as defined in
@@ -105,58 +489,30 @@ class ISM(object):
         appropriate amount based on these parameters.
 
         FD values should be input in units of seconds, frequency array in MHz
-        FD values can be a list or an array
+        FD values can be a list or an array. If verbose is True, the time
+        taken to shift the signal is printed. Floating point signal data is
+        converted to single precision (float32) before it is shifted.
 
         .. math::
             \Delta t_{\rm{FD}} = \sum_{i=1}^{n} c_{i} \log\left({\frac{\nu}{1~\rm{GHz}}}\right)^{i}.
         """
-        #freq in MHz, delays in milliseconds
-        freq_array = signal._dat_freq
-        # define the reference frequency
-        ref_freq = make_quant(1000.0, 'MHz')
-        # calculate the delay added in for the parameters
-        time_delays = make_quant(np.zeros(len(freq_array)), 'ms') # will be in seconds
-        for ii in range(len(FD_params)):
-            time_delays += np.double(make_quant(FD_params[ii], 's').to('ms') * \
-                    np.power(np.log(freq_array/ref_freq),ii+1)) # will be in seconds
+        self.apply_delays(signal, FD_params=FD_params, verbose=verbose)
 
-        if signal.delay==None:
-            signal._delay=time_delays
-        else:
-            signal._delay += time_delays
-        # get time shift based on the sample rate
-        shift_dt = (1/signal._samprate).to('ms')
-        shift_start = time.time()
-        # check if there are less than 20 frequency channels
-        if signal.Nchan <= 20:
-            div_fac = 1
-        else:
-            div_fac = 20
-
-        for ii, freq in enumerate(freq_array):
-            signal._data[ii,:] = shift_t(signal._data[ii,:],
-                                         time_delays[ii].value,
-                                         dt=shift_dt.value)
-            if (ii+1) % int(signal.Nchan//div_fac) ==0:
-                shift_check = time.time()
-                percent = round((ii + 1)*100/signal.Nchan)
-                elapsed = shift_check-shift_start
-                chk_str = '\r{0:2.0f}% shifted'.format(percent)
-                chk_str += ' in {0:4.3f} seconds.'.format(elapsed)
-
-                try:
-                    print(chk_str , end='', flush=True)
-                #This is the Python 2 version
-                #__future__ does not have 'flush' kwarg.
-                except:
-                    print(chk_str , end='')
-                sys.stdout.flush()
-
-        # May need to add tihs parameter to signal
-        signal._FDshifted = True
+    def _FD_delays(self, signal, FD_params):
+        """
+        Returns the delay [ms] of each frequency channel due to the input FD
+        parameters [s].
+        """
+        #freq in MHz, delays in milliseconds
+        freq_mhz = signal._dat_freq.to('MHz').value
+        # evaluate the FD polynomial in log(freq/1 GHz), delays in ms
+        log_freq = np.log(freq_mhz/1000.0)
+        coeffs = [0.0] + [make_quant(FD_param, 's').to('ms').value \
+                          for FD_param in FD_params]
+        return np.polynomial.polynomial.polyval(log_freq, coeffs)
 
     def scatter_broaden(self, signal, tau_d, ref_freq, beta = KOLMOGOROV_BETA, \
-                        convolve = False, pulsar = None):
+                        convolve = False, pulsar = None, verbose = False):
         """
         Function to add scatter broadening delays to simulated data. We offer
         two methods to do this, one where the delay is calcuated and the
@@ -176,49 +532,21 @@ class ISM(object):
         convolve [bool] : If False, signal will be directly shifted in time by
                           scattering delay; if True, scattering delay tails
                           will be directly convolved with the pulse profiles.
+                          The convolution is circular, so tails longer than
+                          the pulse period wrap around the profile. If
+                          False, floating point signal data is converted to
+                          single precision (float32) before it is shifted.
         pulsar [object] : previously defined pulsar class object with profile
                           already assigned
+        verbose [bool] : If True, print the time taken to shift the signal.
         """
-        # First get and define values to use
-        freq_array = signal._dat_freq
-        ref_freq = make_quant(ref_freq, 'MHz')
-        tau_d = make_quant(tau_d, 's').to('ms') # need compatible units with dt
-        # Scale the scattering timescale with frequency
-        tau_d_scaled = self.scale_tau_d(tau_d, ref_freq , freq_array, beta=beta)
         # First shift signal if convolve = False
         if not convolve:
-            if signal.delay==None:
-                signal._delay=tau_d_scaled
-            else:
-                signal._delay += tau_d_scaled
-            # define bin size to shift by
-            shift_dt = (1/signal._samprate).to('ms')
-            shift_start = time.time()
-            # check if there are less than 20 frequency channels
-            if signal.Nchan <= 20:
-                div_fac = 1
-            else:
-                div_fac = 20
-            # now loop through and scale things appropriately
-            for ii, freq in enumerate(freq_array):
-                signal._data[ii,:] = shift_t(signal._data[ii,:],
-                                             tau_d_scaled[ii].value,
-                                             dt=shift_dt.value)
-                if (ii+1) % int(signal.Nchan//div_fac) ==0:
-                    shift_check = time.time()
-                    percent = round((ii + 1)*100/signal.Nchan)
-                    elapsed = shift_check-shift_start
-                    chk_str = '\r{0:2.0f}% scatter shifted'.format(percent)
-                    chk_str += ' in {0:4.3f} seconds.'.format(elapsed)
-
-                    try:
-                        print(chk_str , end='', flush=True)
-                    #This is the Python 2 version
-                    #__future__ does not have 'flush' kwarg.
-                    except:
-                        print(chk_str , end='')
-                    sys.stdout.flush()
+            self.apply_delays(signal, tau_d=tau_d, ref_freq=ref_freq,
+                              beta=beta, verbose=verbose)
         else:
+            # Scale the scattering timescale with frequency, in ms
+            tau_ms = self._scatter_delays(signal, tau_d, ref_freq, beta=beta)
             # Make the initial profile data array at correct sample rate
             Nph = int((signal.samprate * pulsar.period).decompose())
             pulsar.Profiles.init_profiles(Nph, signal.Nchan)
@@ -226,20 +554,84 @@ class ISM(object):
             phs = np.linspace(0.0, 1.0, Nph)
             # full_profs is a data array of the profiles
             full_profs = pulsar.Profiles.calc_profiles(phs, signal.Nchan)
-            # Now we make the array of exponential scattering tails
-            t = np.linspace(0, pulsar.period, Nph)
-            EXP_array = np.zeros((signal.Nchan, Nph))
-            #Iterating over the tau arrays where each profile corresponds to the respective tau index
-            for ii, tau_scatter in enumerate(tau_d_scaled):
-                EXP = (np.exp(-t/tau_scatter))
-                EXP_array[ii,:] = EXP
-            # Now we convolve the profiles
-            convolved_profs = self.convolve_profile(full_profs, EXP_array, \
-                                                  width=Nph)
+            # Now we convolve the profiles with the exponential scattering
+            # tails directly in the Fourier domain
+            dph = (pulsar.period/(Nph-1)).to('ms').value
+            tau_samples = tau_ms/dph
+            convolved_profs = _convolve_exp_tails(full_profs, tau_samples)
             # Now we reassign the pulsar profile object
             pulsar._Profiles = DataPortrait(convolved_profs)
 
 
+    def _scatter_delays(self, signal, tau_d, ref_freq, beta=KOLMOGOROV_BETA):
+        """
+        Returns the scattering timescale [ms] of each frequency channel,
+        scaled from tau_d [s] measured at ref_freq [MHz].
+        """
+        tau_ms = make_quant(tau_d, 's').to('ms').value
+        ref_mhz = make_quant(ref_freq, 'MHz').to('MHz').value
+        freq_mhz = signal._dat_freq.to('MHz').value
+        return self.scale_tau_d(tau_ms, ref_mhz, freq_mhz, beta=beta)
+
+    def apply_delays(self, signal, dm=None, FD_params=None, tau_d=None, \
+                     ref_freq=None, beta=KOLMOGOROV_BETA, verbose=False):
+        """
+        Function to apply dispersion, FD shifts and scattering shifts to a
+        filterbank signal at once. The per-channel delays of each effect are
+        summed and the signal is shifted with a single FFT pass, rather than
+        one pass per effect. This is equivalent to calling `disperse`,
+        `FD_shift` and `scatter_broaden` (with convolve = False) in turn,
+        which all use this function for filterbank signals. If no effect is
+        given the signal is left unchanged.
+
+        Parameters
+        ----------
+
+        signal [object] : filterbank signal class object
+        dm [float] : dispersion measure [pc/cm^3], if None no dispersion
+        FD_params [list] : FD parameters [seconds], if None no FD shift
+        tau_d [float] : scattering delay [seconds], if None no scattering
+        ref_freq [float] : reference frequency [MHz] at which tau_d was
+                           measured, required if tau_d is given
+        beta [float] : preferred scaling law for tau_d, default is for a
+                       Kolmoogorov medium (11/3)
+        verbose [bool] : if True, print the time taken to shift the signal
+        """
+        if dm is None and FD_params is None and tau_d is None:
+            return
+        if signal.sigtype!='FilterBankSignal':
+            msg = 'Channel delays can only be applied to a FilterBankSignal, '
+            msg += '{} has no channel frequencies!'.format(signal.sigtype)
+            raise ValueError(msg)
+        if dm is not None and hasattr(signal,'_dispersed'):
+            raise ValueError('Signal has already been dispersed!')
+        if tau_d is not None and ref_freq is None:
+            raise ValueError('ref_freq is required to scale tau_d!')
+
+        delays_ms = np.zeros(signal.Nchan)
+        actions = []
+        if dm is not None:
+            signal._dm = make_quant(dm,'pc/cm^3')
+            delays_ms += self._dispersion_delays(signal, signal._dm)
+            actions.append('dispersed')
+        if FD_params is not None:
+            delays_ms += self._FD_delays(signal, FD_params)
+            actions.append('FD shifted')
+        if tau_d is not None:
+            delays_ms += self._scatter_delays(signal, tau_d, ref_freq, beta=beta)
+            actions.append('scatter shifted')
+
+        self._apply_time_shift(signal, delays_ms, action=', '.join(actions),
+                               verbose=verbose)
+
+        if dm is not None:
+            signal._dispersed = True
+        if FD_params is not None:
+            # May need to add tihs parameter to signal
+            signal._FDshifted = True
+        if tau_d is not None:
+            signal._scattered = True
+
     def convolve_profile(self, profiles, convolve_array, width = 2048):
         """
         Function to convolve some array generated by a function with the
@@ -297,7 +689,8 @@ class ISM(object):
     TODO: Should units be assigned here, or earlier?
     '''
 
-    def scale_dnu_d(self,dnu_d,nu_i,nu_f,beta=KOLMOGOROV_BETA):
+    @staticmethod
+    def scale_dnu_d(dnu_d,nu_i,nu_f,beta=KOLMOGOROV_BETA):
         """
         Scaling law for scintillation bandwidth as a function of frequency.
 
@@ -311,13 +704,10 @@ class ISM(object):
                        Kolmogorov medium (11/3)
         """
         #dnu_d = make_quant(dnu_d, 'MHz')
-        if beta < 4:
-            exp = 2.0*beta/(beta-2) #(22.0/5)
-        elif beta > 4:
-            exp = 8.0/(6-beta)
-        return dnu_d*(nu_f/nu_i)**exp
+        return _scale_law(dnu_d, nu_i, nu_f, -_scatt_exp(beta))
 
-    def scale_dt_d(self,dt_d,nu_i,nu_f,beta=KOLMOGOROV_BETA):
+    @staticmethod
+    def scale_dt_d(dt_d,nu_i,nu_f,beta=KOLMOGOROV_BETA):
         """
         Scaling law for scintillation timescale as a function of frequency.
 
@@ -331,13 +721,10 @@ class ISM(object):
                        Kolmoogorov medium (11/3)
         """
        # dt_d = make_quant(dt_d, 's')
-        if beta < 4:
-            exp = 2.0/(beta-2) #(6.0/5)
-        elif beta > 4:
-            exp = float(beta-2)/(6-beta)
-        return dt_d*(nu_f/nu_i)**exp
+        return _scale_law(dt_d, nu_i, nu_f, _scint_time_exp(beta))
 
-    def scale_tau_d(self,tau_d,nu_i,nu_f,beta=KOLMOGOROV_BETA):
+    @staticmethod
+    def scale_tau_d(tau_d,nu_i,nu_f,beta=KOLMOGOROV_BETA):
         """
         Scaling law for the scattering timescale as a function of frequency.
 
@@ -351,8 +738,4 @@ class ISM(object):
                        Kolmoogorov medium (11/3)
         """
         #tau_d = make_quant(tau_d, 's')
-        if beta < 4:
-            exp = -2.0*beta/(beta-2) #(-22.0/5)
-        elif beta > 4:
-            exp = -8.0/(6-beta)
-        return tau_d*(nu_f/nu_i)**exp
+        return _scale_law(tau_d, nu_i, nu_f, _scatt_exp(beta))
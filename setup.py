@@ -13,12 +13,18 @@ with open('HISTORY.rst') as history_file:
 
 requirements = [
     'numpy<=1.17.3',
-    'scipy',
+    'scipy>=1.4.0',
     'matplotlib>=2.0.0',
     'pdat',
     'pint-pulsar',
 ]
 
+# optional packages that speed up the ISM module, used if installed
+extra_requirements = {
+    'fast': ['numba', 'pyfftw'],
+    'gpu': ['cupy'],
+}
+
 setup_requirements = [
     'pytest-runner',
     # TODO: put setup requirements (distutils extensions, etc.) here
@@ -48,6 +54,7 @@ setup(
     include_package_data=True,
     package_data={'psrsigsim': ['PTA_pulsar_nb_data.txt', 'data/*.par','data/*.npy']},
     install_requires=requirements,
+    extras_require=extra_requirements,
     license="MIT license",
     zip_safe=False,
     keywords='psrsigsim',
@@ -9,8 +9,12 @@ from psrsigsim.signal.fb_signal import FilterBankSignal
 from psrsigsim.signal.bb_signal import BasebandSignal
 from psrsigsim.pulsar.profiles import DataProfile
 from psrsigsim.pulsar.pulsar import Pulsar
-from psrsigsim.ism.ism import ISM
-from psrsigsim.utils.utils import make_quant
+from psrsigsim.ism.ism import ISM, _baseband_H, _fft_shift_inplace, \
+    _convolve_exp_tails, use_pyfftw, FFT_PLAN_SHAPES, \
+    _cuda_available
+from psrsigsim.utils.utils import make_quant, shift_t
+from psrsigsim.utils.constants import DM_K
+import astropy.units as u
 import numpy as np
 
 @pytest.fixture
@@ -150,3 +154,251 @@ def test_shiftlowchan(S_lowchan, pulsar, ism):
     ism.scatter_broaden(S_lowchan, 5e-6, 1400.0)
     
     
+
+def test_disperse_vs_shift_t(signal, pulsar, ism):
+    """
+    Test batched dispersion against per-channel shift_t.
+    """
+    tobs = make_quant(0.5,'s')
+    pulsar.make_pulses(signal,tobs)
+    dt = (1/signal.samprate).to('ms').value
+    delays = (DM_K * make_quant(10,'pc/cm^3') * \
+              np.power(signal.dat_freq,-2)).to('ms').value
+    expected = np.array([shift_t(signal.data[ii,:], delays[ii], dt=dt) \
+                         for ii in range(signal.Nchan)])
+    ism.disperse(signal,10)
+    assert np.allclose(signal.data, expected, atol=1e-3)
+
+def test_apply_delays_sequential(pulsar, ism):
+    """
+    Test combined delays against applying each effect in turn.
+    """
+    tobs = make_quant(0.5,'s')
+    sig_seq = FilterBankSignal(1400,400,Nsubband=64)
+    sig_all = FilterBankSignal(1400,400,Nsubband=64)
+    pulsar.make_pulses(sig_seq,tobs)
+    sig_all._data = sig_seq.data.copy()
+    ism.disperse(sig_seq,10)
+    ism.FD_shift(sig_seq,[1e-5, -2e-5])
+    ism.scatter_broaden(sig_seq, 5e-6, 1400.0)
+    ism.apply_delays(sig_all, dm=10, FD_params=[1e-5, -2e-5], tau_d=5e-6, \
+                     ref_freq=1400.0)
+    assert sig_all.dm.value==10
+    assert sig_all._FDshifted==True
+    assert np.allclose(sig_all.delay.value, sig_seq.delay.value)
+    # shifts only differ in the Nyquist bin of even length data
+    assert np.allclose(sig_all.data, sig_seq.data, \
+                       atol=1e-2*np.max(sig_seq.data))
+    with pytest.raises(ValueError):
+        ism.apply_delays(sig_all, dm=10)
+
+def test_FD_delays(signal, ism):
+    """
+    Test FD delays against the explicit sum over FD parameters.
+    """
+    FD_params = [2e-4, -3e-4, 7e-5]
+    log_freq = np.log(signal.dat_freq.to('MHz').value/1000.0)
+    expected = np.zeros(signal.Nchan)
+    for ii, FD_param in enumerate(FD_params):
+        expected += FD_param * 1e3 * log_freq**(ii+1)
+    assert np.allclose(ism._FD_delays(signal, FD_params), expected)
+
+def test_bb_disperse_transfer(bbsignal, j1713_profile, ism):
+    """
+    Test baseband dispersion against the per-channel transfer function.
+    """
+    tobs = make_quant(0.05,'s')
+    period = make_quant(5,'ms')
+    psr = Pulsar(period, 10, profiles = j1713_profile, name='J1746-0118')
+    psr.make_pulses(bbsignal,tobs)
+    dm = make_quant(10,'pc/cm^3')
+    f0 = bbsignal.fcent
+    dt = (1/bbsignal.samprate).to('s').value
+    expected = np.zeros(bbsignal.data.shape)
+    for x in range(bbsignal.Nchan):
+        fourier = np.fft.rfft(bbsignal.data[x])
+        u = make_quant(np.fft.rfftfreq(2 * len(fourier) - 1, d=dt), 'MHz')
+        f = u-bbsignal.bw/2.
+        H = np.exp(1j*2*np.pi*DM_K/((f+f0)*f0**2)*dm*f**2)
+        expected[x] = np.fft.irfft(fourier*H)
+    ism.disperse(bbsignal,10)
+    assert np.allclose(bbsignal.data, expected, atol=1e-3)
+
+def test_baseband_H_cache():
+    """
+    Test caching of the baseband transfer function.
+    """
+    H = _baseband_H(2048, 1e-6, 400.0, 1400.0, 10.0)
+    assert H is _baseband_H(2048, 1e-6, 400.0, 1400.0, 10.0)
+    assert not H.flags.writeable
+    # full length arrays, so only a couple are kept
+    assert _baseband_H.cache_info().maxsize <= 2
+
+def test_verbose(signal, pulsar, ism, capsys):
+    """
+    Test that shift timing is only printed when verbose.
+    """
+    tobs = make_quant(0.5,'s')
+    pulsar.make_pulses(signal,tobs)
+    ism.disperse(signal,10)
+    assert 'dispersed' not in capsys.readouterr().out
+    ism.FD_shift(signal, [1e-5, -2e-5], verbose=True)
+    assert 'shifted' in capsys.readouterr().out
+
+def test_fft_shift_inplace():
+    """
+    Test batched FFT shift against integer rolls.
+    """
+    data = np.random.normal(size=(4, 256))
+    out = np.zeros(data.shape)
+    _fft_shift_inplace(data, np.array([0., 1., 5., 100.]), out=out)
+    for ii, shift in enumerate([0, 1, 5, 100]):
+        assert np.allclose(out[ii], np.roll(data[ii], shift))
+    expected = np.roll(data, 3, axis=1)
+    _fft_shift_inplace(data, np.array([3., 3., 3., 3.]))
+    assert np.allclose(data, expected)
+    # again reusing cached FFT plans, if available
+    plans = {}
+    for ii in range(2):
+        shifted = data.copy()
+        _fft_shift_inplace(shifted, np.array([-3., -3., -3., -3.]), plans=plans)
+        assert np.allclose(shifted, np.roll(expected, -3, axis=1))
+    # the plans never hold on to the shifted data, and only a few are kept
+    for Nsamp in [128, 200, 256]:
+        _fft_shift_inplace(np.random.normal(size=(4, Nsamp)), \
+                           np.zeros(4), plans=plans)
+    assert len(plans) <= FFT_PLAN_SHAPES
+    for rfft, irfft in plans.values():
+        assert not np.shares_memory(rfft.input_array, shifted)
+
+def test_scalinglaw_values():
+    """
+    Test scaling law exponents for a Kolmogorov medium and at beta = 4.
+    """
+    nu_i = make_quant(1400.0, 'MHz')
+    nu_f = make_quant(700.0, 'MHz')
+    tau_d = make_quant(5e-6, 's')
+    assert np.isclose(ISM.scale_tau_d(tau_d,nu_i,nu_f).value, \
+                      5e-6 * 2**(22.0/5))
+    assert np.isclose(ISM.scale_dnu_d(20.0,1400.0,700.0), 20.0 * 2**(-22.0/5))
+    assert np.isclose(ISM.scale_dt_d(3600.0,1400.0,700.0), 3600.0 * 2**(-6.0/5))
+    assert np.isclose(ISM.scale_tau_d(1.0,1400.0,700.0,beta=4), 2**4)
+    assert np.isclose(ISM.scale_dt_d(1.0,1400.0,700.0,beta=4), 0.5)
+
+def test_convolve_exp_tails(ism):
+    """
+    Test Fourier domain scattering tails against direct convolution.
+    """
+    Nph = 512
+    ph = np.arange(Nph)/Nph
+    profiles = np.tile(np.exp(-0.5*((ph-0.3)/0.02)**2), (3,1))
+    tau_samples = np.array([0.5, 4.0, 20.0])
+    t = np.arange(Nph)
+    exp_array = np.exp(-t[None,:]/tau_samples[:,None])
+    expected = ism.convolve_profile(profiles.copy(), exp_array, width=Nph)
+    convolved = _convolve_exp_tails(profiles, tau_samples)
+    assert np.allclose(convolved, expected, atol=1e-6)
+    assert np.allclose(convolved.sum(axis=1), profiles.sum(axis=1))
+    # tails too long to resolve flatten the profiles to their means
+    flat = _convolve_exp_tails(profiles, np.array([1e18, 1e18, 1e18]))
+    assert np.all(np.isfinite(flat))
+    assert np.allclose(flat, profiles.mean(axis=1)[:,None])
+
+def test_float32(signal, pulsar, ism):
+    """
+    Test that dispersed data is single precision.
+    """
+    tobs = make_quant(0.5,'s')
+    pulsar.make_pulses(signal,tobs)
+    signal._data = signal.data.astype(np.float64)
+    ism.disperse(signal,10)
+    assert signal.data.dtype==np.float32
+    assert signal.data.flags.c_contiguous
+
+def test_int8(pulsar, ism):
+    """
+    Test that int8 data keeps its dtype when dispersed.
+    """
+    tobs = make_quant(0.5,'s')
+    sig = FilterBankSignal(1400,400,Nsubband=64,dtype=np.int8)
+    pulsar.make_pulses(sig,tobs)
+    sig._data = sig.data.astype(np.int8)
+    expected = sig.data.astype(np.float32)
+    # same FFT path as disperse, so the truncating cast agrees exactly
+    _fft_shift_inplace(expected, \
+        ism._dispersion_delays(sig, make_quant(10,'pc/cm^3')) \
+        / (1/sig.samprate).to('ms').value, plans=ism._fft_plans)
+    ism.disperse(sig,10)
+    assert sig.data.dtype==sig.dtype==np.int8
+    assert np.array_equal(sig.data, expected.astype(np.int8))
+
+def test_scalinglaw_arrays():
+    """
+    Test scaling laws on plain and quantity frequency arrays.
+    """
+    nu_f = np.linspace(1200.0, 1600.0, 2048)
+    tau = ISM.scale_tau_d(5e-3, 1400.0, nu_f)
+    tau_quant = ISM.scale_tau_d(make_quant(5e-3,'ms'), \
+                                make_quant(1400.0,'MHz'), nu_f * u.MHz)
+    assert np.allclose(tau, 5e-3 * (nu_f/1400.0)**(-22.0/5))
+    assert np.allclose(tau_quant.to('ms').value, tau)
+
+def test_apply_delays(pulsar, ism):
+    """
+    Test flags and delays set by the fused delay function.
+    """
+    tobs = make_quant(0.5,'s')
+    sig = FilterBankSignal(1400,400,Nsubband=64)
+    pulsar.make_pulses(sig,tobs)
+    ism.apply_delays(sig, dm=10, FD_params=[1e-5], tau_d=5e-6, \
+                     ref_freq=1400.0)
+    assert sig._dispersed and sig._FDshifted and sig._scattered
+    expected = ism._dispersion_delays(sig, make_quant(10,'pc/cm^3')) \
+               + ism._FD_delays(sig, [1e-5]) \
+               + ism._scatter_delays(sig, 5e-6, 1400.0)
+    assert np.allclose(sig.delay.to('ms').value, expected)
+    with pytest.raises(ValueError):
+        ism.disperse(sig,10)
+    with pytest.raises(ValueError):
+        ism.apply_delays(sig, tau_d=5e-6)
+    data = sig.data
+    ism.apply_delays(sig)
+    assert sig.data is data
+    assert np.allclose(sig.delay.to('ms').value, expected)
+    with pytest.raises(ValueError, match='FilterBankSignal'):
+        ism.FD_shift(BasebandSignal(1400,400,Nchan=2),[1e-5])
+
+def test_prepare_shapes(pulsar):
+    """
+    Test preparing FFTs for known data shapes.
+    """
+    shapes = [(64, 244), (64, 512), (64, 1024)]
+    ism = ISM(shapes=shapes)
+    tobs = make_quant(0.5,'s')
+    sig = FilterBankSignal(1400,400,Nsubband=64)
+    pulsar.make_pulses(sig,tobs)
+    key = (sig.data.shape, '<f4')
+    if use_pyfftw:
+        # every prepared shape is kept, and disperse reuses its plans
+        assert set(ism._fft_plans) == set((shape, '<f4') for shape in shapes)
+        assert key in ism._fft_plans
+    ism.disperse(sig,10)
+    assert sig.dm.value==10
+    if use_pyfftw:
+        assert set(ism._fft_plans) == set((shape, '<f4') for shape in shapes)
+
+def test_backend(signal, pulsar):
+    """
+    Test choosing where filterbank shifts are done.
+    """
+    with pytest.raises(ValueError):
+        ISM(backend='gpu')
+    if not _cuda_available():
+        with pytest.raises(ImportError):
+            ISM(backend='cupy')
+    ism = ISM(backend='cpu')
+    tobs = make_quant(0.5,'s')
+    pulsar.make_pulses(signal,tobs)
+    ism.disperse(signal,10)
+    assert not ism._use_gpu()
+    assert not ISM()._use_gpu()